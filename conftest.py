@@ -0,0 +1,15 @@
+"""
+Shared pytest fixtures for the MCP MySQL Server tests
+"""
+
+import pytest
+
+from test_mcp_server import MCPServerTester
+
+
+@pytest.fixture(scope="session")
+def tester():
+    """MCPServerTester shared by all tests running in one worker process"""
+    tester = MCPServerTester()
+    yield tester
+    tester.close()
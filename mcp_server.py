@@ -5,11 +5,20 @@ with natural language query support using Ollama/Llama 3.2
 """
 
 import os
+import re
+import asyncio
 import json
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 from typing import Dict, List, Optional, Any
+import orjson
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+from mysql.connector.pooling import MySQLConnectionPool
 import requests
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
@@ -23,8 +32,10 @@ load_dotenv()
 # Configure logging to stderr (important for MCP servers)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 log_file_path = os.path.join(script_dir, "mcp.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
-    level=logging.DEBUG,
+    # Unknown level names fall back to INFO instead of failing at startup
+    level=logging.getLevelNamesMapping().get(LOG_LEVEL, logging.INFO),
     # stream=sys.stderr,
     filename=log_file_path,
     filemode="a",
@@ -43,36 +54,96 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME", "test_db"),
     "port": int(os.getenv("DB_PORT", "3306")),
 }
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+# Number of rows fetched per round-trip when streaming query results
+FETCH_BATCH_SIZE = 1000
+# Upper bound on the rows get_table_data returns
+MAX_TABLE_DATA_LIMIT = 1000
+# Result format for query tools: "json" or "markdown"
+RESULT_FORMAT = os.getenv("MCP_RESULT_FORMAT", "json").lower()
+
+# Schema cache configuration
+SCHEMA_TTL = int(os.getenv("SCHEMA_TTL", "60"))
+_DDL_RE = re.compile(r"^\s*(CREATE|DROP|ALTER|RENAME|TRUNCATE)\b", re.IGNORECASE)
 
 # # Ollama configuration
 # OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 # OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 
 # Database connection pool
+connection_pool = None
+# Serializes lazy pool creation across the database executor's threads
+_pool_lock = threading.Lock()
 engine = None
 SessionLocal = None
+# Blocking database work runs here, one worker per pooled connection, so
+# concurrent tool calls queue instead of finding the pool exhausted
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="mysql")
+
+
+def init_connection_pool():
+    """Initialize the MySQL connection pool"""
+    global connection_pool
+    if not mysql.connector.HAVE_CEXT:
+        logger.warning(
+            "mysql-connector C extension not available, "
+            "falling back to the slower pure Python implementation"
+        )
+    connection_pool = MySQLConnectionPool(
+        pool_name="mcp",
+        pool_size=DB_POOL_SIZE,
+        pool_reset_session=True,
+        # Discard rows left unread on a streaming cursor before reuse
+        consume_results=True,
+        # Every tool call runs a single statement, so skip implicit transactions
+        autocommit=True,
+        # Parse the protocol with the C extension when it is installed;
+        # requesting it explicitly without the extension raises ImportError
+        use_pure=not mysql.connector.HAVE_CEXT,
+        **DB_CONFIG,
+    )
 
 
 def get_db_connection():
-    """Create a database connection"""
+    """Get a database connection from the pool.
+
+    Calling close() on the returned connection, or leaving a with block
+    around it, hands it back to the pool.
+    """
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        if connection_pool is None:
+            with _pool_lock:
+                if connection_pool is None:
+                    init_connection_pool()
+        return connection_pool.get_connection()
     except Error as e:
-        logger.error(f"Error connecting to MySQL: {e}")
+        logger.error("Error connecting to MySQL: %s", e)
         raise Exception(f"Database connection error: {e}")
 
 
+async def run_db(func, *args):
+    """Run blocking database work on the database executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, func, *args)
+
+
 def init_database():
     """Initialize database connection pool"""
     global engine, SessionLocal
     try:
         db_url = f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        engine = create_engine(db_url)
+        engine = create_engine(
+            db_url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=32,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        init_connection_pool()
         logger.info("Database connection pool initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing database: {e}")
+        logger.error("Error initializing database: %s", e)
         raise
 
 
@@ -107,60 +178,179 @@ def init_database():
 #     return query_ollama(prompt)
 
 
-def get_database_schema() -> str:
-    """Get database schema information"""
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+# Cached schema text and the time.monotonic() it was built at
+_schema_cache = {"text": None, "ts": 0.0}
+# Cached table names, sharing the schema cache TTL and invalidation
+_tables_cache = {"tables": None, "ts": 0.0}
 
-        # Get all tables
+
+def invalidate_schema_cache():
+    """Discard the cached database schema and table names"""
+    _schema_cache["text"] = None
+    _schema_cache["ts"] = 0.0
+    _tables_cache["tables"] = None
+    _tables_cache["ts"] = 0.0
+
+
+def get_table_names() -> List[str]:
+    """Get the names of all tables in the database, cached for SCHEMA_TTL seconds"""
+    if (
+        _tables_cache["tables"] is not None
+        and time.monotonic() - _tables_cache["ts"] < SCHEMA_TTL
+    ):
+        return _tables_cache["tables"]
+
+    with get_db_connection() as connection, connection.cursor() as cursor:
         cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
+        tables = [table[0] for table in cursor.fetchall()]
 
-        schema_info = "Database Schema:\n\n"
+    _tables_cache["tables"] = tables
+    _tables_cache["ts"] = time.monotonic()
+    return tables
 
-        for table in tables:
-            table_name = list(table.values())[0]
-            schema_info += f"Table: {table_name}\n"
 
-            # Get columns for this table
-            cursor.execute(f"DESCRIBE {table_name}")
-            columns = cursor.fetchall()
+def get_database_schema() -> str:
+    """Get database schema information, cached for SCHEMA_TTL seconds"""
+    if (
+        _schema_cache["text"] is not None
+        and time.monotonic() - _schema_cache["ts"] < SCHEMA_TTL
+    ):
+        return _schema_cache["text"]
+
+    try:
+        with get_db_connection() as connection, connection.cursor(
+            dictionary=True
+        ) as cursor:
+            # Get the columns of every table in a single round-trip
+            cursor.execute(
+                """
+                SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE,
+                       COLUMN_KEY, COLUMN_DEFAULT
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+                """,
+                (DB_CONFIG["database"],),
+            )
+            rows = cursor.fetchall()
+
+        parts = ["Database Schema:\n\n"]
+
+        for table_name, columns in groupby(rows, key=itemgetter("TABLE_NAME")):
+            parts.append(f"Table: {table_name}\n")
 
             for column in columns:
-                col_name = column["Field"]
-                col_type = column["Type"]
-                col_null = "NULL" if column["Null"] == "YES" else "NOT NULL"
-                col_key = column["Key"]
-                col_default = column["Default"]
+                col_name = column["COLUMN_NAME"]
+                col_type = column["COLUMN_TYPE"]
+                col_null = "NULL" if column["IS_NULLABLE"] == "YES" else "NOT NULL"
+                col_key = column["COLUMN_KEY"]
+                col_default = column["COLUMN_DEFAULT"]
 
-                schema_info += f"  - {col_name}: {col_type} {col_null}"
+                parts.append(f"  - {col_name}: {col_type} {col_null}")
                 if col_key:
-                    schema_info += f" {col_key}"
+                    parts.append(f" {col_key}")
                 if col_default:
-                    schema_info += f" DEFAULT {col_default}"
-                schema_info += "\n"
+                    parts.append(f" DEFAULT {col_default}")
+                parts.append("\n")
+
+            parts.append("\n")
 
-            schema_info += "\n"
+        schema_info = "".join(parts)
 
-        cursor.close()
-        connection.close()
+        _schema_cache["text"] = schema_info
+        _schema_cache["ts"] = time.monotonic()
         return schema_info
     except Exception as e:
-        logger.error(f"Error getting database schema: {e}")
+        logger.error("Error getting database schema: %s", e)
         return f"Error getting schema: {e}"
 
 
+def table_not_found_message(table_name: str) -> str:
+    """Build the error message for a missing table, listing the available ones"""
+    tables = get_table_names()
+    return f"Table '{table_name}' not found. Available tables: {', '.join(tables)}"
+
+
+def quote_identifier(name: str) -> str:
+    """Backtick-quote an identifier for interpolation into SQL"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def fetch_in_batches(cursor, batch_size: int = FETCH_BATCH_SIZE):
+    """Yield the rows of an executed query, fetching batch_size rows at a time"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def format_table_rows(headers: List[str], rows) -> List[str]:
+    """Format query result rows (tuples in header order) as Markdown table lines"""
+    sep = " | "
+    lines = [
+        "| " + sep.join(headers) + " |",
+        "|" + "|".join(["-" * len(header) for header in headers]) + "|",
+    ]
+    lines.extend("| " + sep.join(map(str, row)) + " |" for row in rows)
+    return lines
+
+
+def format_results_json(headers: List[str], rows: List[tuple]) -> str:
+    """Format query result rows as a JSON document"""
+    return orjson.dumps({"columns": list(headers), "rows": rows}, default=str).decode()
+
+
 # Initialize database on startup
 try:
     init_database()
 except Exception as e:
-    logger.error(f"Failed to initialize database: {e}")
+    logger.error("Failed to initialize database: %s", e)
 
 
 # === MCP TOOLS ===
 
 
+def _execute_sql_query_sync(query: str) -> str:
+    """Blocking implementation of execute_sql_query"""
+    try:
+        with get_db_connection() as connection, connection.cursor(
+            buffered=False
+        ) as cursor:
+            # Execute the query
+            cursor.execute(query)
+
+            # For statements that return a result set, stream it into the formatter
+            if cursor.with_rows:
+                rows = fetch_in_batches(cursor)
+                if RESULT_FORMAT == "json":
+                    return format_results_json(cursor.column_names, list(rows))
+
+                lines = format_table_rows(cursor.column_names, rows)
+                row_count = len(lines) - 2  # minus header and separator lines
+
+                if not row_count:
+                    return "Query executed successfully. No results returned."
+
+                # Format results as a readable string
+                parts = [f"Query Results ({row_count} rows):", ""]
+                parts.extend(lines)
+                return "\n".join(parts)
+
+            else:
+                # For other queries, return affected rows
+                affected_rows = cursor.rowcount
+
+                # Schema changes make the cached schema stale
+                if _DDL_RE.match(query):
+                    invalidate_schema_cache()
+
+                return f"Query executed successfully. {affected_rows} rows affected."
+
+    except Exception as e:
+        return f"Error executing query: {str(e)}"
+
+
 @mcp.tool()
 async def execute_sql_query(query: str) -> str:
     """Execute a SQL query and return the results.
@@ -168,55 +358,7 @@ async def execute_sql_query(query: str) -> str:
     Args:
         query: The SQL query to execute (SELECT, INSERT, UPDATE, DELETE, etc.)
     """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # Execute the query
-        cursor.execute(query)
-
-        # For SELECT queries, fetch the results
-        if query.strip().upper().startswith("SELECT"):
-            results = cursor.fetchall()
-
-            if not results:
-                cursor.close()
-                connection.close()
-                return "Query executed successfully. No results returned."
-
-            # Format results as a readable string
-            output = f"Query Results ({len(results)} rows):\n\n"
-
-            # Add headers
-            if results:
-                headers = list(results[0].keys())
-                output += "| " + " | ".join(headers) + " |\n"
-                output += (
-                    "|" + "|".join(["-" * len(header) for header in headers]) + "|\n"
-                )
-
-                # Add data rows
-                for row in results:
-                    output += (
-                        "| "
-                        + " | ".join(str(row[header]) for header in headers)
-                        + " |\n"
-                    )
-
-            cursor.close()
-            connection.close()
-            return output
-
-        else:
-            # For non-SELECT queries, return affected rows
-            affected_rows = cursor.rowcount
-            connection.commit()
-            cursor.close()
-            connection.close()
-            return f"Query executed successfully. {affected_rows} rows affected."
-
-    except Exception as e:
-        return f"Error executing query: {str(e)}"
+    return await run_db(_execute_sql_query_sync, query)
 
 
 # @mcp.tool()
@@ -240,25 +382,16 @@ async def execute_sql_query(query: str) -> str:
 #         return f"Error processing natural language query: {str(e)}"
 
 
-@mcp.tool()
-async def list_tables() -> str:
-    """List all tables in the database."""
+def _list_tables_sync() -> str:
+    """Blocking implementation of list_tables"""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
+        tables = get_table_names()
 
         if not tables:
             return "No tables found in the database."
 
         output = "Tables in the database:\n\n"
-        for i, table in enumerate(tables, 1):
-            table_name = table[0]
+        for i, table_name in enumerate(tables, 1):
             output += f"{i}. {table_name}\n"
 
         return output
@@ -268,48 +401,57 @@ async def list_tables() -> str:
 
 
 @mcp.tool()
-async def describe_table(table_name: str) -> str:
-    """Get detailed information about a specific table.
-
-    Args:
-        table_name: The name of the table to describe
-    """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+async def list_tables() -> str:
+    """List all tables in the database."""
+    return await run_db(_list_tables_sync)
 
-        # Check if table exists
-        cursor.execute("SHOW TABLES")
-        tables = [list(table.values())[0] for table in cursor.fetchall()]
 
-        if table_name not in tables:
-            cursor.close()
-            connection.close()
-            return (
-                f"Table '{table_name}' not found. Available tables: {', '.join(tables)}"
+def _describe_table_sync(table_name: str, exact: bool = False) -> str:
+    """Blocking implementation of describe_table"""
+    try:
+        with get_db_connection() as connection, connection.cursor(
+            dictionary=True
+        ) as cursor:
+            # Get table structure and estimated row count in one round-trip
+            cursor.execute(
+                """
+                SELECT t.TABLE_ROWS, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE,
+                       c.COLUMN_KEY, c.COLUMN_DEFAULT, c.EXTRA
+                FROM information_schema.TABLES t
+                JOIN information_schema.COLUMNS c
+                  ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+                WHERE t.TABLE_SCHEMA = %s AND t.TABLE_NAME = %s
+                ORDER BY c.ORDINAL_POSITION
+                """,
+                (DB_CONFIG["database"], table_name),
             )
+            columns = cursor.fetchall()
 
-        # Get table structure
-        cursor.execute(f"DESCRIBE {table_name}")
-        columns = cursor.fetchall()
+            # Row count is estimated from table statistics unless exact is requested
+            if columns and exact:
+                cursor.execute(
+                    f"SELECT COUNT(*) as count FROM {quote_identifier(table_name)}"
+                )
+                row_count = cursor.fetchone()["count"]
 
-        # Get row count
-        cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-        row_count = cursor.fetchone()["count"]
+        # Listing the available tables takes a connection of its own
+        if not columns:
+            return table_not_found_message(table_name)
 
-        cursor.close()
-        connection.close()
+        if not exact:
+            estimate = columns[0]["TABLE_ROWS"]
+            row_count = "unknown" if estimate is None else f"~{estimate} (approximate)"
 
         output = f"Table: {table_name}\n"
         output += f"Rows: {row_count}\n\n"
         output += "Columns:\n\n"
 
         for col in columns:
-            output += f"- {col['Field']}: {col['Type']}\n"
-            output += f"  - Null: {'YES' if col['Null'] == 'YES' else 'NO'}\n"
-            output += f"  - Key: {col['Key'] or 'None'}\n"
-            output += f"  - Default: {col['Default'] or 'None'}\n"
-            output += f"  - Extra: {col['Extra'] or 'None'}\n\n"
+            output += f"- {col['COLUMN_NAME']}: {col['COLUMN_TYPE']}\n"
+            output += f"  - Null: {'YES' if col['IS_NULLABLE'] == 'YES' else 'NO'}\n"
+            output += f"  - Key: {col['COLUMN_KEY'] or 'None'}\n"
+            output += f"  - Default: {col['COLUMN_DEFAULT'] or 'None'}\n"
+            output += f"  - Extra: {col['EXTRA'] or 'None'}\n\n"
 
         return output
 
@@ -318,64 +460,79 @@ async def describe_table(table_name: str) -> str:
 
 
 @mcp.tool()
-async def get_table_data(table_name: str, limit: int = 10) -> str:
-    """Get sample data from a table.
+async def describe_table(table_name: str, exact: bool = False) -> str:
+    """Get detailed information about a specific table.
+
+    The row count is an estimate from table statistics unless exact is set,
+    since an exact COUNT(*) scans the whole table.
 
     Args:
-        table_name: The name of the table
-        limit: Maximum number of rows to return (default: 10)
+        table_name: The name of the table to describe
+        exact: Count rows exactly instead of estimating (default: False)
     """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    return await run_db(_describe_table_sync, table_name, exact)
 
-        # Check if table exists
-        cursor.execute("SHOW TABLES")
-        tables = [list(table.values())[0] for table in cursor.fetchall()]
-
-        if table_name not in tables:
-            cursor.close()
-            connection.close()
-            return (
-                f"Table '{table_name}' not found. Available tables: {', '.join(tables)}"
-            )
 
-        # Get sample data
-        query = f"SELECT * FROM {table_name} LIMIT {limit}"
-        cursor.execute(query)
-        results = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
-
-        if not results:
+def _get_table_data_sync(table_name: str, limit: int = 10) -> str:
+    """Blocking implementation of get_table_data"""
+    try:
+        limit = max(1, min(int(limit), MAX_TABLE_DATA_LIMIT))
+
+        with get_db_connection() as connection, connection.cursor(
+            buffered=False
+        ) as cursor:
+            # Get sample data, a missing table surfaces as ER_NO_SUCH_TABLE
+            try:
+                cursor.execute(
+                    f"SELECT * FROM {quote_identifier(table_name)} LIMIT %s", (limit,)
+                )
+            except Error as e:
+                if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                lines = None
+            else:
+                rows = fetch_in_batches(cursor, min(limit, FETCH_BATCH_SIZE))
+                if RESULT_FORMAT == "json":
+                    return format_results_json(cursor.column_names, list(rows))
+
+                lines = format_table_rows(cursor.column_names, rows)
+
+        # Listing the available tables takes a connection of its own
+        if lines is None:
+            return table_not_found_message(table_name)
+
+        row_count = len(lines) - 2  # minus header and separator lines
+        if not row_count:
             return f"No data found in table '{table_name}'."
 
         # Format results
-        output = f"Sample data from {table_name} (showing {len(results)} rows):\n\n"
-
-        # Add headers
-        headers = list(results[0].keys())
-        output += "| " + " | ".join(headers) + " |\n"
-        output += "|" + "|".join(["-" * len(header) for header in headers]) + "|\n"
+        parts = [f"Sample data from {table_name} (showing {row_count} rows):", ""]
+        parts.extend(lines)
 
-        # Add data rows
-        for row in results:
-            output += "| " + " | ".join(str(row[header]) for header in headers) + " |\n"
-
-        return output
+        return "\n".join(parts)
 
     except Exception as e:
         return f"Error getting table data: {str(e)}"
 
 
+@mcp.tool()
+async def get_table_data(table_name: str, limit: int = 10) -> str:
+    """Get sample data from a table.
+
+    Args:
+        table_name: The name of the table
+        limit: Maximum number of rows to return (default: 10, max: 1000)
+    """
+    return await run_db(_get_table_data_sync, table_name, limit)
+
+
 # === MCP RESOURCES ===
 
 
 @mcp.resource("schema://database")
 async def get_database_schema_resource() -> str:
     """Get the complete database schema as a resource."""
-    return get_database_schema()
+    return await run_db(get_database_schema)
 
 
 @mcp.resource("schema://tables/{table_name}")
@@ -5,20 +5,138 @@ This script tests the basic functionality of the MCP server using the MCP Inspec
 """
 
 import asyncio
+import functools
+import importlib.util
+import os
+import select
+import signal
+import socket
 import subprocess
 import sys
 import time
+from types import MappingProxyType
 from typing import Dict, Any, Optional
 import json
 
 
+# Environment variables the tests read, with the defaults the server uses
+ENV_DEFAULTS = {
+    "DB_HOST": "localhost",
+    "DB_USER": "root",
+    "DB_PASSWORD": "",
+    "DB_NAME": "test_db",
+    "DB_PORT": "3306",
+    "OLLAMA_URL": "http://localhost:11434",
+    "OLLAMA_MODEL": "llama3.2",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def warm_up_uv() -> bool:
+    """Let uv resolve and sync the project environment, once per process"""
+    try:
+        result = subprocess.run(
+            ["uv", "run", "python", "-c", "import mcp"],
+            capture_output=True,
+            timeout=30
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    return result.returncode == 0
+
+
+def free_ports(count: int) -> list:
+    """Find count distinct TCP ports that are currently free on localhost"""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(("127.0.0.1", 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+async def port_is_open(port: int, host: str = "127.0.0.1") -> bool:
+    """Check whether something accepts TCP connections on host:port"""
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+
+# MySQL connection pool shared by the database tests, created on first use
+_POOL = None
+
+
+def get_db_pool(env):
+    """Get the tests' MySQL connection pool, creating it on first use"""
+    global _POOL
+    if _POOL is None:
+        import mysql.connector.pooling
+        
+        # The pool opens all of its connections up front, so keep it as
+        # small as the number of tests that use the database
+        _POOL = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="mcp_test",
+            pool_size=1,
+            host=env["DB_HOST"],
+            user=env["DB_USER"],
+            password=env["DB_PASSWORD"],
+            database=env["DB_NAME"],
+            port=int(env["DB_PORT"])
+        )
+    return _POOL
+
+
 class MCPServerTester:
     def __init__(self, server_script: str = "mcp_server.py"):
         self.server_script = server_script
         self.server_process = None
+        self._http = None
         
-    def start_server(self) -> bool:
-        """Start the MCP server process"""
+        # Load .env once and snapshot the settings the tests use
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass  # reported by test_dependencies
+        self.env = MappingProxyType(
+            {var: os.environ.get(var, default) for var, default in ENV_DEFAULTS.items()}
+        )
+        
+    @property
+    def http(self):
+        """Keep-alive HTTP session shared by all HTTP probes (created on first use,
+        so a missing requests package is reported by test_dependencies)"""
+        if self._http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            self._http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+            self._http.mount("http://", adapter)
+            self._http.mount("https://", adapter)
+        return self._http
+    
+    @staticmethod
+    def _json(response):
+        """Parse an HTTP response body with orjson"""
+        import orjson
+        
+        return orjson.loads(response.content)
+    
+    def close(self):
+        """Release the HTTP session's pooled sockets"""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        
+    def start_server(self, timeout: float = 10) -> bool:
+        """Start the MCP server process and wait until it answers over stdio"""
         print("Starting MCP server...")
         try:
             # Start the server process
@@ -30,19 +148,51 @@ class MCPServerTester:
                 text=True
             )
             
-            # Give it a moment to start
-            time.sleep(2)
+            # The server prints no banner, so ask it to initialize and treat
+            # the response as the ready signal
+            initialize_request = {
+                "jsonrpc": "2.0",
+                "id": 0,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "mcp-server-tester", "version": "0.1.0"},
+                },
+            }
+            self.server_process.stdin.write(json.dumps(initialize_request) + "\n")
+            self.server_process.stdin.flush()
             
-            # Check if process is running
-            if self.server_process.poll() is None:
-                print("✓ MCP server started successfully")
-                return True
-            else:
-                print("✗ MCP server failed to start")
-                stderr = self.server_process.stderr.read()
-                if stderr:
-                    print(f"Error: {stderr}")
-                return False
+            stdout_fd = self.server_process.stdout.fileno()
+            os.set_blocking(stdout_fd, False)
+            output = b""
+            deadline = time.monotonic() + timeout
+            
+            while time.monotonic() < deadline:
+                # Check if process is still running
+                if self.server_process.poll() is not None:
+                    print("✗ MCP server failed to start")
+                    stderr = self.server_process.stderr.read()
+                    if stderr:
+                        print(f"Error: {stderr}")
+                    return False
+                
+                readable, _, _ = select.select([stdout_fd], [], [], 0.05)
+                if not readable:
+                    continue
+                
+                output += os.read(stdout_fd, 65536)
+                for line in output.splitlines():
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(message, dict) and message.get("id") == 0:
+                        print("✓ MCP server started successfully")
+                        return True
+            
+            print(f"✗ MCP server did not respond within {timeout}s")
+            return False
                 
         except Exception as e:
             print(f"✗ Error starting server: {e}")
@@ -60,56 +210,102 @@ class MCPServerTester:
                 print("✗ Server did not stop gracefully, killing...")
                 self.server_process.kill()
     
-    def test_mcp_inspector(self) -> bool:
+    async def test_mcp_inspector(self, timeout: float = 10) -> bool:
         """Test the server with MCP Inspector"""
         print("\nTesting with MCP Inspector...")
         try:
-            # Run MCP Inspector in development mode
-            result = subprocess.run(
-                ["uv", "run", "mcp", "dev", self.server_script],
-                capture_output=True,
-                text=True,
-                timeout=10
+            # Resolve the uv environment up front so the launch below starts warm;
+            # the warm-up has its own timeout and does not eat into the launch's
+            if not await asyncio.to_thread(warm_up_uv):
+                print("✗ MCP Inspector test failed: uv could not import mcp")
+                return False
+            
+            # Give the Inspector UI and proxy free ports, so an Inspector that is
+            # already running can neither block this one nor pass in its place
+            client_port, server_port = free_ports(2)
+            
+            # Run MCP Inspector in development mode, in its own process group
+            # so the npx processes it spawns are stopped along with it
+            process = await asyncio.create_subprocess_exec(
+                "uv", "run", "mcp", "dev", self.server_script,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+                env={
+                    **os.environ,
+                    "CLIENT_PORT": str(client_port),
+                    "SERVER_PORT": str(server_port),
+                }
             )
             
-            if result.returncode == 0:
-                print("✓ MCP Inspector test passed")
-                return True
-            else:
-                print(f"✗ MCP Inspector test failed: {result.stderr}")
+            try:
+                # Pass as soon as the Inspector accepts connections
+                deadline = time.monotonic() + timeout
+                while process.returncode is None and time.monotonic() < deadline:
+                    if await port_is_open(client_port):
+                        print("✓ MCP Inspector started successfully")
+                        return True
+                    await asyncio.sleep(0.1)
+                exited = process.returncode is not None
+            finally:
+                if process.returncode is None:
+                    try:
+                        os.killpg(process.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+                    try:
+                        await asyncio.wait_for(process.wait(), timeout=5)
+                    except asyncio.TimeoutError:
+                        print("✗ MCP Inspector did not stop gracefully, killing...")
+                        try:
+                            os.killpg(process.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                        await process.wait()
+            
+            if not exited:
+                print(f"✗ MCP Inspector did not open port {client_port} within {timeout}s")
                 return False
+            
+            stderr = await process.stderr.read()
+            print(f"✗ MCP Inspector exited before starting: {stderr.decode().strip()}")
+            return False
                 
-        except subprocess.TimeoutExpired:
-            print("✓ MCP Inspector started successfully (timeout expected)")
-            return True
         except Exception as e:
             print(f"✗ Error testing with MCP Inspector: {e}")
             return False
     
-    def test_direct_execution(self) -> bool:
+    async def test_direct_execution(self) -> bool:
         """Test direct execution of the server"""
         print("\nTesting direct server execution...")
         try:
             # Test if the server script can be executed
-            result = subprocess.run(
-                [sys.executable, "-c", f"import {self.server_script.replace('.py', '')}; print('Import successful')"],
-                capture_output=True,
-                text=True,
-                timeout=5
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", f"import {self.server_script.replace('.py', '')}; print('Import successful')",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
             
-            if result.returncode == 0:
+            try:
+                _, stderr = await asyncio.wait_for(process.communicate(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                print("✗ Server script import timed out")
+                return False
+            
+            if process.returncode == 0:
                 print("✓ Server script can be imported")
                 return True
             else:
-                print(f"✗ Server script import failed: {result.stderr}")
+                print(f"✗ Server script import failed: {stderr.decode()}")
                 return False
                 
         except Exception as e:
             print(f"✗ Error testing direct execution: {e}")
             return False
     
-    def test_dependencies(self) -> bool:
+    async def test_dependencies(self) -> bool:
         """Test if all required dependencies are available"""
         print("\nTesting dependencies...")
         required_modules = [
@@ -117,36 +313,37 @@ class MCPServerTester:
             "mysql.connector", 
             "sqlalchemy",
             "requests",
-            "dotenv"
+            "dotenv",
+            "orjson"
         ]
         
         all_good = True
         for module in required_modules:
+            # find_spec locates the module without executing it; only parent
+            # packages (e.g. "mysql" for "mysql.connector") get imported
             try:
-                __import__(module)
-                print(f"✓ {module} is available")
+                spec = importlib.util.find_spec(module)
             except ImportError:
+                spec = None
+            
+            if spec is not None:
+                print(f"✓ {module} is available")
+            else:
                 print(f"✗ {module} is missing")
                 all_good = False
         
         return all_good
     
-    def test_environment_config(self) -> bool:
+    async def test_environment_config(self) -> bool:
         """Test if environment configuration is valid"""
         print("\nTesting environment configuration...")
         try:
-            from dotenv import load_dotenv
-            import os
-            
-            # Load environment variables
-            load_dotenv()
-            
-            # Check required environment variables
+            # Check required environment variables (.env was loaded in __init__)
             required_vars = ["DB_HOST", "DB_USER", "DB_NAME", "OLLAMA_URL", "OLLAMA_MODEL"]
             missing_vars = []
             
             for var in required_vars:
-                if not os.getenv(var):
+                if not os.environ.get(var):
                     missing_vars.append(var)
             
             if missing_vars:
@@ -160,26 +357,18 @@ class MCPServerTester:
             print(f"✗ Error testing environment configuration: {e}")
             return False
     
-    def test_database_connection(self) -> bool:
+    async def test_database_connection(self) -> bool:
         """Test database connection"""
         print("\nTesting database connection...")
         try:
-            import mysql.connector
-            from dotenv import load_dotenv
-            import os
-            
-            load_dotenv()
+            def check_connection():
+                connection = get_db_pool(self.env).get_connection()
+                connection.ping(reconnect=True)
+                connection.close()  # returns the connection to the pool
             
             # Try to connect to the database
-            connection = mysql.connector.connect(
-                host=os.getenv("DB_HOST", "localhost"),
-                user=os.getenv("DB_USER", "root"),
-                password=os.getenv("DB_PASSWORD", ""),
-                database=os.getenv("DB_NAME", "test_db"),
-                port=int(os.getenv("DB_PORT", "3306"))
-            )
+            await asyncio.to_thread(check_connection)
             
-            connection.close()
             print("✓ Database connection successful")
             return True
             
@@ -187,23 +376,19 @@ class MCPServerTester:
             print(f"✗ Database connection failed: {e}")
             return False
     
-    def test_ollama_connection(self) -> bool:
+    async def test_ollama_connection(self) -> bool:
         """Test Ollama connection"""
         print("\nTesting Ollama connection...")
         try:
-            import requests
-            from dotenv import load_dotenv
-            import os
-            
-            load_dotenv()
-            
-            ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
+            ollama_url = self.env["OLLAMA_URL"]
             
             # Test Ollama API
-            response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+            response = await asyncio.to_thread(
+                self.http.get, f"{ollama_url}/api/tags", timeout=5
+            )
             
             if response.status_code == 200:
-                models = response.json().get("models", [])
+                models = self._json(response).get("models", [])
                 model_names = [model["name"] for model in models]
                 print(f"✓ Ollama connection successful")
                 print(f"  Available models: {', '.join(model_names)}")
@@ -216,30 +401,45 @@ class MCPServerTester:
             print(f"✗ Ollama connection failed: {e}")
             return False
     
-    def run_all_tests(self) -> bool:
-        """Run all tests"""
+    async def run_all_tests(self) -> bool:
+        """Run all tests concurrently"""
         print("=== MCP MySQL Server Test Suite ===\n")
         
+        # (name, test, names of the tests it depends on); a test whose
+        # dependencies did not all pass is skipped instead of run
         tests = [
-            ("Dependencies", self.test_dependencies),
-            ("Environment Configuration", self.test_environment_config),
-            ("Database Connection", self.test_database_connection),
-            ("Ollama Connection", self.test_ollama_connection),
-            ("Direct Execution", self.test_direct_execution),
-            ("MCP Inspector", self.test_mcp_inspector),
+            ("Dependencies", self.test_dependencies, []),
+            ("Environment Configuration", self.test_environment_config, []),
+            ("Database Connection", self.test_database_connection, ["Dependencies"]),
+            ("Ollama Connection", self.test_ollama_connection, ["Dependencies"]),
+            ("Direct Execution", self.test_direct_execution, ["Dependencies"]),
+            ("MCP Inspector", self.test_mcp_inspector, ["Dependencies"]),
         ]
+        tasks = {}
         
-        results = []
+        async def run_test(test_name, test_func, deps):
+            dep_results = await asyncio.gather(
+                *(tasks[dep] for dep in deps), return_exceptions=True
+            )
+            if not all(result is True for result in dep_results):
+                print(f"\nSKIP {test_name} test: requires {', '.join(deps)}")
+                return None
+            return await test_func()
         
-        for test_name, test_func in tests:
-            print(f"Running {test_name} test...")
-            try:
-                result = test_func()
-                results.append((test_name, result))
-            except Exception as e:
-                print(f"✗ {test_name} test failed with exception: {e}")
-                results.append((test_name, False))
-            print()
+        print(f"Running {', '.join(test_name for test_name, _, _ in tests)} tests...")
+        for test_name, test_func, deps in tests:
+            tasks[test_name] = asyncio.ensure_future(
+                run_test(test_name, test_func, deps)
+            )
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        print()
+        
+        results = []
+        for (test_name, _, _), outcome in zip(tests, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"✗ {test_name} test failed with exception: {outcome}")
+                outcome = False
+            results.append((test_name, outcome))
         
         # Summary
         print("=== Test Summary ===")
@@ -247,7 +447,7 @@ class MCPServerTester:
         total = len(results)
         
         for test_name, result in results:
-            status = "PASS" if result else "FAIL"
+            status = "SKIP" if result is None else "PASS" if result else "FAIL"
             print(f"{test_name}: {status}")
             if result:
                 passed += 1
@@ -262,12 +462,41 @@ class MCPServerTester:
             return False
 
 
+# === PYTEST ENTRY POINTS ===
+# The diagnostics double as pytest tests (the tester fixture lives in
+# conftest.py), so they can be spread over workers with: pytest -n auto
+
+
+def test_dependencies(tester):
+    assert asyncio.run(tester.test_dependencies())
+
+
+def test_environment_config(tester):
+    assert asyncio.run(tester.test_environment_config())
+
+
+def test_database_connection(tester):
+    assert asyncio.run(tester.test_database_connection())
+
+
+def test_ollama_connection(tester):
+    assert asyncio.run(tester.test_ollama_connection())
+
+
+def test_direct_execution(tester):
+    assert asyncio.run(tester.test_direct_execution())
+
+
+def test_mcp_inspector(tester):
+    assert asyncio.run(tester.test_mcp_inspector())
+
+
 def main():
     """Main function to run tests"""
     tester = MCPServerTester()
     
     try:
-        success = tester.run_all_tests()
+        success = asyncio.run(tester.run_all_tests())
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\nTests interrupted by user")
@@ -275,6 +504,8 @@ def main():
     except Exception as e:
         print(f"\nUnexpected error: {e}")
         sys.exit(1)
+    finally:
+        tester.close()
 
 
 if __name__ == "__main__":